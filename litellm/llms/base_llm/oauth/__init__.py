@@ -0,0 +1,8 @@
+"""
+Base OAuth credentials-file authenticator module.
+"""
+from litellm.llms.base_llm.oauth.authenticator import BaseOAuthCredsAuthenticator
+
+__all__ = [
+    "BaseOAuthCredsAuthenticator",
+]
@@ -0,0 +1,629 @@
+"""
+Shared token cache/refresh engine for providers authenticated via an OAuth
+CLI's cached credentials file (e.g. ~/.gemini/oauth_creds.json).
+"""
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
+from urllib.parse import quote
+
+import httpx
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None  # type: ignore[assignment]
+
+from litellm._logging import verbose_logger
+from litellm.exceptions import Timeout
+from litellm.llms.base_llm.chat.transformation import BaseLLMException
+from litellm.llms.custom_httpx.http_handler import _get_httpx_client
+
+# Background refresh renews the token this long before it expires
+BACKGROUND_REFRESH_WINDOW_SECONDS = 300
+# First retry delay after a transient refresh failure, doubled on each failure
+BACKGROUND_REFRESH_RETRY_SECONDS = 30
+# Minimum gap between successful refreshes, for tokens issued with a lifetime
+# shorter than the refresh window
+BACKGROUND_REFRESH_MIN_INTERVAL_SECONDS = 30
+# Upper bound on a single sleep so the refresher notices a discarded authenticator;
+# also caps the retry backoff
+BACKGROUND_REFRESH_MAX_SLEEP_SECONDS = 300
+
+_AuthenticatorT = TypeVar("_AuthenticatorT", bound="BaseOAuthCredsAuthenticator")
+
+
+def _json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def _run_background_refresh(
+    auth_ref: "weakref.ReferenceType[BaseOAuthCredsAuthenticator]",
+    wakeup: threading.Event,
+) -> None:
+    try:
+        _background_refresh_loop(auth_ref, wakeup)
+    finally:
+        # Normally already cleared on exit; this covers unexpected errors so a
+        # later schedule starts a new thread instead of waking a dead one
+        auth = auth_ref()
+        if auth is not None:
+            with auth._lock:
+                if auth._refresh_thread is threading.current_thread():
+                    auth._refresh_thread = None
+
+
+def _background_refresh_loop(
+    auth_ref: "weakref.ReferenceType[BaseOAuthCredsAuthenticator]",
+    wakeup: threading.Event,
+) -> None:
+    """
+    Background refresh loop. Only holds a weak reference to the authenticator
+    so that discarded instances can be garbage collected.
+    """
+    failures = 0
+    while True:
+        auth = auth_ref()
+        if auth is None:
+            return
+        with auth._lock:
+            if auth._refresh_thread is not threading.current_thread():
+                return  # stopped by close()
+            delay = auth._next_background_refresh_delay()
+            if delay is None:
+                auth._refresh_thread = None
+                return
+        del auth
+
+        if wakeup.wait(timeout=min(delay, BACKGROUND_REFRESH_MAX_SLEEP_SECONDS)):
+            wakeup.clear()
+            continue
+        if delay > BACKGROUND_REFRESH_MAX_SLEEP_SECONDS:
+            continue
+
+        auth = auth_ref()
+        if auth is None:
+            return
+        try:
+            refreshed = auth._background_refresh()
+        except BaseLLMException as e:
+            # Permanent failure (e.g. revoked refresh token, creds removed);
+            # restarted by the next successful load of the creds
+            verbose_logger.warning(
+                f"Stopping background {auth.provider_name} OAuth refresh: {e}"
+            )
+            with auth._lock:
+                auth._refresh_thread = None
+            return
+        except Exception as e:  # noqa: BLE001
+            verbose_logger.warning(
+                f"Background {auth.provider_name} OAuth refresh failed unexpectedly: {e}"
+            )
+            refreshed = False
+        del auth
+        if refreshed:
+            failures = 0
+            continue
+
+        # Transient failure: retry with exponential backoff
+        retry_delay = min(
+            BACKGROUND_REFRESH_RETRY_SECONDS * 2**failures,
+            BACKGROUND_REFRESH_MAX_SLEEP_SECONDS,
+        )
+        failures += 1
+        wakeup.wait(timeout=retry_delay)
+        wakeup.clear()
+
+
+# Process-wide authenticators keyed by (class, token_path, api_base), so every
+# config instance shares the same in-memory token cache and background refresher
+_AUTHENTICATORS: Dict[Tuple[type, str, str], "BaseOAuthCredsAuthenticator"] = {}
+_AUTHENTICATORS_LOCK = threading.Lock()
+
+
+class BaseOAuthCredsAuthenticator:
+    """
+    Loads, caches and refreshes the access token stored in an OAuth CLI's
+    credentials file:
+      {
+        "access_token": "...",
+        "refresh_token": "...",
+        "expiry_date": 1730000000000,
+        ...
+      }
+
+    Valid tokens are served from memory until the file's mtime changes, a
+    daemon thread renews them ahead of expiry, and concurrent refreshes are
+    collapsed into a single request to the token endpoint.
+
+    Subclasses set the provider-specific class attributes below.
+    """
+
+    provider_name: str  # used in log and error messages, e.g. "Gemini"
+    env_prefix: str  # e.g. "GEMINI_OAUTH" for GEMINI_OAUTH_TOKEN_FILE
+    default_token_path: str  # already expanded
+    default_api_base: str
+    token_endpoint: str
+    # Form-encoded refresh body minus the refresh_token, which varies per call
+    refresh_body_prefix: str
+    missing_creds_message: str
+    get_access_token_error: Type[BaseLLMException]
+    refresh_token_error: Type[BaseLLMException]
+
+    def __init__(self) -> None:
+        self.token_path = self._resolve_token_path()
+        self.api_base = self._resolve_api_base()
+        self._fsync_on_save = os.getenv(f"{self.env_prefix}_FSYNC", "0") == "1"
+
+        # In-memory copy of the creds file, invalidated when its mtime changes
+        self._lock = threading.Lock()
+        self._cached_creds: Optional[Dict[str, Any]] = None
+        self._cached_access_token: Optional[str] = None
+        self._cached_expiry_seconds: Optional[float] = None
+        # Whole-second time after which the cached token must be refreshed
+        self._cached_expiry_deadline: Optional[int] = None
+        self._cached_mtime: Optional[float] = None
+        self._cached_api_base: Optional[str] = None
+
+        # Daemon thread renewing the token ahead of expiry, started lazily
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._refresh_wakeup = threading.Event()
+        # Earliest time the next background refresh may run
+        self._refresh_not_before = 0.0
+
+        # Single-flight refresh: concurrent callers wait on the in-flight one
+        self._refresh_lock = threading.Lock()
+        self._refresh_in_progress: Optional["Future[str]"] = None
+
+    @classmethod
+    def get_shared(cls: Type[_AuthenticatorT]) -> _AuthenticatorT:
+        """
+        Returns the shared authenticator for the currently configured token
+        path and API base, creating it on first use.
+        """
+        key = (cls, cls._resolve_token_path(), cls._resolve_api_base())
+        with _AUTHENTICATORS_LOCK:
+            authenticator = _AUTHENTICATORS.get(key)
+            if authenticator is None:
+                authenticator = _AUTHENTICATORS[key] = cls()
+        return authenticator  # type: ignore[return-value]
+
+    @classmethod
+    def _resolve_token_path(cls) -> str:
+        token_dir = os.getenv(f"{cls.env_prefix}_TOKEN_DIR")
+        if token_dir:
+            return os.path.join(os.path.expanduser(token_dir), "oauth_creds.json")
+        token_path = os.getenv(f"{cls.env_prefix}_TOKEN_FILE")
+        if not token_path:
+            return cls.default_token_path
+        return os.path.expanduser(token_path)
+
+    @classmethod
+    def _resolve_api_base(cls) -> str:
+        return os.getenv(f"{cls.env_prefix}_API_BASE", cls.default_api_base)
+
+    def _api_base_from_creds(self, creds: Dict[str, Any]) -> str:
+        return self.api_base
+
+    def get_api_base(self) -> str:
+        mtime = self._get_creds_mtime()
+        with self._lock:
+            if (
+                mtime is not None
+                and mtime == self._cached_mtime
+                and self._cached_api_base is not None
+            ):
+                return self._cached_api_base
+
+        creds = self._load_creds()
+        if not creds:
+            return self.api_base
+        return self._update_cache(creds, mtime)
+
+    def close(self) -> None:
+        """
+        Stops the background refresher, waiting for a refresh in flight. It is
+        started again by the next load of the creds.
+        """
+        with self._lock:
+            refresh_thread = self._refresh_thread
+            self._refresh_thread = None
+            # The stopped thread keeps the old event; a new one gets a fresh event
+            wakeup, self._refresh_wakeup = self._refresh_wakeup, threading.Event()
+        wakeup.set()
+        if refresh_thread is not None and refresh_thread is not threading.current_thread():
+            refresh_thread.join()
+
+    def get_access_token(self) -> str:
+        mtime = self._get_creds_mtime()
+        access_token = self._get_cached_access_token(mtime)
+        if access_token is not None:
+            return access_token
+
+        creds = self._load_creds()
+        if not creds:
+            raise self.get_access_token_error(
+                message=self.missing_creds_message,
+                status_code=401,
+            )
+
+        access_token = creds.get("access_token")
+        expiry_seconds = creds.get("_expiry_seconds")
+        if access_token and not self._is_expired(expiry_seconds):
+            self._update_cache(creds, mtime)
+            return access_token
+
+        refresh_token = creds.get("refresh_token")
+        if not refresh_token:
+            raise self.get_access_token_error(
+                message="Access token expired and no refresh token available.",
+                status_code=401,
+            )
+
+        return self._refresh_access_token_once(refresh_token, creds)
+
+    async def aget_access_token(self) -> str:
+        """
+        Async variant of get_access_token. A cached token is returned directly;
+        loading or refreshing the creds blocks, so that runs in the default
+        executor instead of on the event loop.
+        """
+        access_token = self._get_cached_access_token(self._get_creds_mtime())
+        if access_token is not None:
+            return access_token
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.get_access_token
+        )
+
+    def _get_cached_access_token(self, mtime: Optional[float]) -> Optional[str]:
+        with self._lock:
+            if mtime is not None and mtime == self._cached_mtime:
+                if self._cached_access_token and (
+                    self._cached_expiry_deadline is None
+                    or self._cached_expiry_deadline > time.time()
+                ):
+                    return self._cached_access_token
+        return None
+
+    def _get_creds_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.token_path).st_mtime
+        except OSError:
+            return None
+
+    def _update_cache(self, creds: Dict[str, Any], mtime: Optional[float]) -> str:
+        """
+        Caches the parsed creds and returns the API base resolved from them.
+        """
+        api_base = self._api_base_from_creds(creds)
+        with self._lock:
+            self._cached_creds = creds
+            self._cached_access_token = creds.get("access_token")
+            self._cached_expiry_seconds = expiry_seconds = creds.get("_expiry_seconds")
+            self._cached_expiry_deadline = (
+                None if expiry_seconds is None else int(expiry_seconds) - 60
+            )
+            self._cached_api_base = api_base
+            self._cached_mtime = mtime
+        self._schedule_background_refresh()
+        return api_base
+
+    def _schedule_background_refresh(self) -> None:
+        """
+        Starts the background refresher, or wakes it up so it re-reads the
+        cached expiry when the creds change.
+        """
+        with self._lock:
+            if self._next_background_refresh_delay() is None:
+                return
+            if self._refresh_thread is None or not self._refresh_thread.is_alive():
+                self._refresh_thread = threading.Thread(
+                    target=_run_background_refresh,
+                    args=(weakref.ref(self), self._refresh_wakeup),
+                    name=f"{self.env_prefix.lower().replace('_', '-')}-token-refresh",
+                    daemon=True,
+                )
+                self._refresh_thread.start()
+                return
+        self._refresh_wakeup.set()
+
+    def _next_background_refresh_delay(self) -> Optional[float]:
+        """
+        Seconds until the cached token should be renewed, or None when there is
+        nothing to refresh. Must be called with self._lock held.
+        """
+        if self._cached_expiry_seconds is None or not self._cached_creds:
+            return None
+        if not self._cached_creds.get("refresh_token"):
+            return None
+        refresh_at = max(
+            self._cached_expiry_seconds - BACKGROUND_REFRESH_WINDOW_SECONDS,
+            self._refresh_not_before,
+        )
+        return max(refresh_at - time.time(), 0.0)
+
+    def _delay_next_refresh(self, expiry_seconds: Optional[float]) -> None:
+        """
+        Holds off the next background refresh after a successful one, so tokens
+        issued with a lifetime shorter than the refresh window aren't refreshed
+        again straight away: the refresher waits for half the
+        token's lifetime, but no more than the window and no less than
+        BACKGROUND_REFRESH_MIN_INTERVAL_SECONDS.
+        """
+        now = time.time()
+        lifetime = 0.0 if expiry_seconds is None else expiry_seconds - now
+        with self._lock:
+            self._refresh_not_before = now + max(
+                min(BACKGROUND_REFRESH_WINDOW_SECONDS, lifetime / 2),
+                BACKGROUND_REFRESH_MIN_INTERVAL_SECONDS,
+            )
+
+    def _background_refresh(self) -> bool:
+        """
+        Renews the access token ahead of expiry. Returns False if the refresh
+        failed transiently and should be retried later; raises for failures
+        that retrying won't fix.
+        """
+        mtime = self._get_creds_mtime()
+        creds = self._load_creds()
+        if not creds or not creds.get("refresh_token"):
+            raise self.get_access_token_error(
+                message=self.missing_creds_message,
+                status_code=401,
+            )
+
+        expiry_seconds = creds.get("_expiry_seconds")
+        if (
+            expiry_seconds is not None
+            and expiry_seconds > time.time() + BACKGROUND_REFRESH_WINDOW_SECONDS
+        ):
+            # Already renewed by someone else (e.g. the CLI)
+            self._update_cache(creds, mtime)
+            return True
+
+        try:
+            self._refresh_access_token_once(creds["refresh_token"], creds)
+        except self.refresh_token_error as e:
+            if 400 <= e.status_code < 500 and e.status_code not in (408, 429):
+                raise
+            verbose_logger.warning(f"Background {self.provider_name} OAuth refresh failed: {e}")
+            return False
+        return True
+
+    def _load_creds(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.token_path, "rb") as f:
+                return self._add_expiry_seconds(_json_loads(f.read()))
+        except Exception as e:  # noqa: BLE001
+            verbose_logger.debug(f"Unable to read {self.provider_name} OAuth credentials: {e}")
+        return None
+
+    def _save_creds(self, creds: Dict[str, Any]) -> None:
+        """
+        Persists credentials using an atomic write to prevent corruption
+        during concurrent refreshes.
+
+        By default the data is not fsync'd, so a power loss right after a
+        refresh may lose it (the token can simply be refreshed again). Set
+        <env_prefix>_FSYNC=1 to fsync the file and its directory before returning.
+        """
+
+        tmp_path = f"{self.token_path}.tmp.{os.getpid()}.{time.monotonic_ns()}"
+        try:
+            dir_name = os.path.dirname(self.token_path)
+            os.makedirs(dir_name, exist_ok=True)
+
+            # Write to a temp file first; owner-only permissions since it holds secrets
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "wb") as tmp_f:
+                tmp_f.write(
+                    _json_dumps({k: v for k, v in creds.items() if k != "_expiry_seconds"})
+                )
+                if self._fsync_on_save:
+                    tmp_f.flush()
+                    os.fsync(tmp_f.fileno())
+
+            # Atomic replacement of the target file
+            os.replace(tmp_path, self.token_path)
+            if self._fsync_on_save:
+                self._fsync_dir(dir_name)
+        except Exception as e:  # noqa: BLE001
+            verbose_logger.warning(
+                f"Failed to persist refreshed {self.provider_name} credentials: {e}"
+            )
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _fsync_dir(dir_name: str) -> None:
+        # Persists the rename itself; directories can't be opened on Windows
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        dir_fd = os.open(dir_name, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    @staticmethod
+    def _add_expiry_seconds(creds: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stores expiry_date normalized to seconds under "_expiry_seconds" so
+        expiry checks don't have to redo the conversion. Not persisted.
+        """
+        expiry_date = creds.get("expiry_date")
+        if expiry_date is not None:
+            # expiry_date from google-auth is milliseconds; normalize to seconds
+            creds["_expiry_seconds"] = (
+                expiry_date / 1000 if expiry_date > 10_000_000_000 else expiry_date
+            )
+        return creds
+
+    def _is_expired(self, expiry_seconds: Optional[float]) -> bool:
+        # refresh 1 minute early
+        return expiry_seconds is not None and expiry_seconds < time.time() + 60
+
+    def _begin_refresh(self) -> Tuple["Future[str]", bool]:
+        """
+        Claims the in-flight refresh. Returns (future, True) if the caller has
+        to perform the refresh, or the in-flight (future, False) to wait on.
+        """
+        with self._refresh_lock:
+            future = self._refresh_in_progress
+            if future is not None:
+                return future, False
+            future = self._refresh_in_progress = Future()
+            return future, True
+
+    def _finish_refresh(
+        self,
+        future: "Future[str]",
+        access_token: Optional[str],
+        error: Optional[BaseException] = None,
+    ) -> None:
+        with self._refresh_lock:
+            if self._refresh_in_progress is future:
+                self._refresh_in_progress = None
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(access_token)  # type: ignore[arg-type]
+
+    def _refresh_access_token_once(
+        self, refresh_token: str, existing_creds: Dict[str, Any]
+    ) -> str:
+        """
+        Refreshes the access token, collapsing concurrent refreshes into a single
+        request to the token endpoint.
+        """
+        future, is_owner = self._begin_refresh()
+        if not is_owner:
+            return future.result()
+
+        try:
+            access_token = self._renewed_access_token(existing_creds)
+            if access_token is None:
+                access_token = self._refresh_access_token(refresh_token, existing_creds)
+        except BaseException as e:
+            self._finish_refresh(future, None, e)
+            raise
+        self._finish_refresh(future, access_token)
+        return access_token
+
+    def _renewed_access_token(self, existing_creds: Dict[str, Any]) -> Optional[str]:
+        """
+        Returns the cached access token if another refresh finished after
+        existing_creds were read, so their stale (possibly rotated) refresh
+        token isn't used again.
+        """
+        with self._lock:
+            access_token = self._cached_access_token
+            expiry_seconds = self._cached_expiry_seconds
+        if (
+            access_token
+            and access_token != existing_creds.get("access_token")
+            and not self._is_expired(expiry_seconds)
+        ):
+            return access_token
+        return None
+
+    def _refresh_access_token(
+        self, refresh_token: str, existing_creds: Dict[str, Any]
+    ) -> str:
+        content = self.refresh_body_prefix + "&refresh_token=" + quote(refresh_token, safe="")
+        # HTTPHandler.post raises HTTPStatusError for non-2xx responses and
+        # litellm Timeout for timeouts; only wrap transport/decoding errors
+        try:
+            resp = _get_httpx_client().post(
+                self.token_endpoint,
+                content=content,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=30,
+            )
+            payload = resp.json()
+        except (httpx.HTTPError, Timeout, ValueError) as e:
+            raise self._refresh_error(e)
+        return self._store_refreshed_creds(payload, refresh_token, existing_creds)
+
+    def _refresh_error(self, e: Exception) -> BaseLLMException:
+        if isinstance(e, httpx.HTTPStatusError):
+            return self.refresh_token_error(
+                message=f"{self.provider_name} OAuth refresh failed: {e}",
+                status_code=e.response.status_code,
+                request=e.request,
+                response=e.response,
+            )
+        return self.refresh_token_error(
+            message=f"{self.provider_name} OAuth refresh failed: {e}",
+            status_code=500,
+        )
+
+    def _invalid_refresh_response(self, detail: str) -> BaseLLMException:
+        return self.refresh_token_error(
+            message=f"{self.provider_name} OAuth refresh response {detail}",
+            status_code=500,
+        )
+
+    def _parse_refresh_number(self, payload: Dict[str, Any], key: str) -> float:
+        value = payload[key]
+        if not isinstance(value, bool):
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                pass
+            else:
+                if math.isfinite(number):
+                    return number
+        raise self._invalid_refresh_response(f"has invalid {key}: {value!r}")
+
+    def _store_refreshed_creds(
+        self,
+        payload: Dict[str, Any],
+        refresh_token: str,
+        existing_creds: Dict[str, Any],
+    ) -> str:
+        if not isinstance(payload, dict):
+            raise self._invalid_refresh_response("is not a JSON object")
+        access_token = payload.get("access_token")
+        if not access_token:
+            raise self.refresh_token_error(
+                message=f"{self.provider_name} OAuth refresh response missing access_token",
+                status_code=401,
+            )
+        if not isinstance(access_token, str):
+            raise self._invalid_refresh_response("has a non-string access_token")
+
+        # Merge back into credential cache; keep existing refresh token if not returned
+        updated_creds = {**existing_creds, **payload}
+        if "refresh_token" not in updated_creds:
+            updated_creds["refresh_token"] = refresh_token
+        if "expiry_date" in payload:
+            updated_creds["expiry_date"] = self._parse_refresh_number(payload, "expiry_date")
+        elif "expires_in" in payload:
+            expires_in = self._parse_refresh_number(payload, "expires_in")
+            updated_creds["expiry_date"] = (time.time() + expires_in) * 1000
+        else:
+            # The old expiry belongs to the replaced token and has already
+            # passed; keeping it would refresh again on every call
+            updated_creds.pop("expiry_date", None)
+            updated_creds.pop("_expiry_seconds", None)
+        self._add_expiry_seconds(updated_creds)
+        self._delay_next_refresh(updated_creds.get("_expiry_seconds"))
+        self._save_creds(updated_creds)
+        self._update_cache(updated_creds, self._get_creds_mtime())
+        return access_token
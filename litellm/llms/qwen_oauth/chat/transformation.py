@@ -3,7 +3,7 @@ from typing import Optional, Tuple
 from litellm.exceptions import AuthenticationError
 from litellm.llms.openai.openai import OpenAIConfig
 
-from ..authenticator import Authenticator
+from ..authenticator import get_authenticator
 from ..common_utils import GetAccessTokenError, RefreshTokenError
 
 
@@ -14,7 +14,7 @@ class QwenOAuthConfig(OpenAIConfig):
 
     def __init__(self) -> None:
         super().__init__()
-        self.authenticator = Authenticator()
+        self.authenticator = get_authenticator()
 
     def _get_openai_compatible_provider_info(
         self,
@@ -33,3 +33,27 @@ class QwenOAuthConfig(OpenAIConfig):
                 message=str(e),
             )
         return dynamic_api_base, dynamic_api_key, custom_llm_provider
+
+    async def _aget_openai_compatible_provider_info(
+        self,
+        model: str,
+        api_base: Optional[str],
+        api_key: Optional[str],
+        custom_llm_provider: str,
+    ) -> Tuple[Optional[str], Optional[str], str]:
+        """
+        Async variant of _get_openai_compatible_provider_info that loads or
+        refreshes the access token off the event loop.
+        """
+        if api_key is None:
+            try:
+                api_key = await self.authenticator.aget_access_token()
+            except (GetAccessTokenError, RefreshTokenError) as e:
+                raise AuthenticationError(
+                    model=model,
+                    llm_provider=custom_llm_provider,
+                    message=str(e),
+                )
+        return self._get_openai_compatible_provider_info(
+            model, api_base, api_key, custom_llm_provider
+        )
@@ -550,6 +550,7 @@ async def acompletion(
         "shared_session": shared_session,
     }
     if custom_llm_provider is None:
+        await _aprefetch_oauth_access_token(model)
         _, custom_llm_provider, _, _ = get_llm_provider(
             model=model,
             custom_llm_provider=custom_llm_provider,
@@ -728,6 +729,24 @@ async def _handle_mock_timeout_async(
         )
 
 
+async def _aprefetch_oauth_access_token(model: str) -> None:
+    """
+    OAuth-file providers (gemini_oauth, qwen_oauth) may load or refresh their
+    access token while get_llm_provider() resolves them, which blocks. Fetch the
+    token off the event loop first, so that resolution is served from the
+    authenticator's cache.
+    """
+    provider = model.split("/", 1)[0]
+    if provider == LlmProviders.GEMINI_OAUTH.value:
+        await litellm.GeminiOAuthConfig()._aget_openai_compatible_provider_info(
+            model, None, None, provider
+        )
+    elif provider == LlmProviders.QWEN_OAUTH.value:
+        await litellm.QwenOAuthConfig()._aget_openai_compatible_provider_info(
+            model, None, None, provider
+        )
+
+
 def _sleep_for_timeout(timeout: Union[float, str, httpx.Timeout]):
     if isinstance(timeout, float):
         time.sleep(timeout)
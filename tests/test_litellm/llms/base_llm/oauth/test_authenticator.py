@@ -0,0 +1,632 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlencode
+
+import httpx
+import pytest
+
+from litellm.llms.base_llm.chat.transformation import BaseLLMException
+from litellm.llms.base_llm.oauth.authenticator import BaseOAuthCredsAuthenticator
+
+
+class FakeOAuthError(BaseLLMException):
+    pass
+
+
+class FakeGetAccessTokenError(FakeOAuthError):
+    pass
+
+
+class FakeRefreshTokenError(FakeOAuthError):
+    pass
+
+
+class FakeAuthenticator(BaseOAuthCredsAuthenticator):
+    provider_name = "Fake"
+    env_prefix = "FAKE_OAUTH"
+    default_token_path = os.path.join(os.path.expanduser("~/.fake"), "oauth_creds.json")
+    default_api_base = "https://api.example.com/v1"
+    token_endpoint = "https://auth.example.com/token"
+    refresh_body_prefix = urlencode({"grant_type": "refresh_token", "client_id": "client-id"})
+    missing_creds_message = "Fake OAuth credentials not found."
+    get_access_token_error = FakeGetAccessTokenError
+    refresh_token_error = FakeRefreshTokenError
+
+    instances: List["FakeAuthenticator"] = []
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.instances.append(self)
+
+
+@pytest.fixture(autouse=True)
+def stop_background_refreshers():
+    """
+    Keeps background refreshers started by a test off the network once its own
+    mocks are gone, and stops them when the test ends.
+    """
+    guard_client = MagicMock()
+    guard_client.post.side_effect = AssertionError("token endpoint called outside of a mock")
+    with patch(
+        "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+        return_value=guard_client,
+    ):
+        yield
+        while FakeAuthenticator.instances:
+            FakeAuthenticator.instances.pop().close()
+
+
+class TestBaseOAuthCredsAuthenticator:
+    @pytest.fixture
+    def token_path(self, tmp_path, monkeypatch):
+        path = tmp_path / "oauth_creds.json"
+        monkeypatch.setenv("FAKE_OAUTH_TOKEN_FILE", str(path))
+        monkeypatch.delenv("FAKE_OAUTH_TOKEN_DIR", raising=False)
+        return path
+
+    def _write_creds(self, path, **creds):
+        path.write_text(json.dumps(creds))
+
+    def test_get_access_token_uses_in_memory_cache(self, token_path):
+        """A fresh token is served from memory without re-reading the creds file."""
+        self._write_creds(
+            token_path,
+            access_token="cached-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() + 3600) * 1000,
+        )
+        auth = FakeAuthenticator()
+        assert auth.get_access_token() == "cached-token"
+
+        with patch.object(auth, "_load_creds") as mock_load:
+            assert auth.get_access_token() == "cached-token"
+            mock_load.assert_not_called()
+
+    def test_get_access_token_reloads_when_file_changes(self, token_path):
+        """An external rewrite of the creds file invalidates the cache."""
+        self._write_creds(
+            token_path,
+            access_token="old-token",
+            expiry_date=(time.time() + 3600) * 1000,
+        )
+        auth = FakeAuthenticator()
+        assert auth.get_access_token() == "old-token"
+
+        self._write_creds(
+            token_path,
+            access_token="new-token",
+            expiry_date=(time.time() + 3600) * 1000,
+        )
+        stat = os.stat(token_path)
+        os.utime(token_path, (stat.st_atime, stat.st_mtime + 10))
+        assert auth.get_access_token() == "new-token"
+
+    def test_refresh_populates_cache(self, token_path):
+        """A refreshed token is persisted and served from memory afterwards."""
+        self._write_creds(
+            token_path,
+            access_token="expired-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() - 10) * 1000,
+        )
+        auth = FakeAuthenticator()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "access_token": "fresh-token",
+            "expires_in": 3600,
+        }
+
+        mock_client = MagicMock()
+        mock_client.post.return_value = mock_response
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ), patch.object(auth, "_load_creds", wraps=auth._load_creds) as mock_load:
+            assert auth.get_access_token() == "fresh-token"
+            assert auth.get_access_token() == "fresh-token"
+            mock_client.post.assert_called_once()
+            # the refresh merges into the creds already loaded by get_access_token
+            assert mock_load.call_count == 1
+
+        saved = json.loads(token_path.read_text())
+        assert saved["access_token"] == "fresh-token"
+        assert saved["refresh_token"] == "refresh-token"
+        assert saved["expiry_date"] > time.time() * 1000
+
+    async def test_aget_access_token_refreshes_off_the_event_loop(self, token_path):
+        self._write_creds(
+            token_path,
+            access_token="expired-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() - 10) * 1000,
+        )
+        auth = FakeAuthenticator()
+        post_threads = []
+
+        def post(*args, **kwargs):
+            post_threads.append(threading.get_ident())
+            response = MagicMock()
+            response.json.return_value = {"access_token": "fresh-token", "expires_in": 3600}
+            return response
+
+        mock_client = MagicMock()
+        mock_client.post.side_effect = post
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            assert await auth.aget_access_token() == "fresh-token"
+        assert len(post_threads) == 1
+        assert post_threads[0] != threading.get_ident()
+
+        # a cached token is returned without going through the executor
+        with patch.object(auth, "get_access_token") as mock_get:
+            assert await auth.aget_access_token() == "fresh-token"
+            mock_get.assert_not_called()
+
+    def test_background_refresh_renews_token_before_expiry(self, token_path):
+        """A token close to expiry is renewed off the request path."""
+        self._write_creds(
+            token_path,
+            access_token="expiring-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() + 120) * 1000,
+        )
+        auth = FakeAuthenticator()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "access_token": "fresh-token",
+            "expires_in": 3600,
+        }
+        mock_client = MagicMock()
+        mock_client.post.return_value = mock_response
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            assert auth.get_access_token() == "expiring-token"
+            deadline = time.time() + 5
+            while auth._cached_access_token != "fresh-token" and time.time() < deadline:
+                time.sleep(0.01)
+
+        assert auth._cached_access_token == "fresh-token"
+        assert auth.get_access_token() == "fresh-token"
+        mock_client.post.assert_called_once()
+
+    def test_background_refresh_of_short_lived_token_is_rate_limited(self, token_path):
+        """Tokens living shorter than the refresh window don't trigger a refresh loop."""
+        self._write_creds(
+            token_path,
+            access_token="expiring-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() + 120) * 1000,
+        )
+        auth = FakeAuthenticator()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"access_token": "fresh-token", "expires_in": 60}
+        mock_client = MagicMock()
+        mock_client.post.return_value = mock_response
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            assert auth.get_access_token() == "expiring-token"
+            deadline = time.time() + 5
+            while auth._cached_access_token != "fresh-token" and time.time() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.5)
+
+            assert auth._cached_access_token == "fresh-token"
+            mock_client.post.assert_called_once()
+            with auth._lock:
+                delay = auth._next_background_refresh_delay()
+            assert delay is not None and delay >= 25
+
+    def test_refresh_without_expiry_drops_stale_expiry(self, token_path):
+        """A refreshed token without an expiry is treated as non-expiring."""
+        self._write_creds(
+            token_path,
+            access_token="expired-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() - 10) * 1000,
+        )
+        auth = FakeAuthenticator()
+        mock_client = MagicMock()
+        mock_client.post.return_value.json.return_value = {"access_token": "fresh-token"}
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            assert auth.get_access_token() == "fresh-token"
+            assert auth.get_access_token() == "fresh-token"
+            mock_client.post.assert_called_once()
+
+        assert "expiry_date" not in json.loads(token_path.read_text())
+        assert auth._cached_expiry_deadline is None
+        assert auth._refresh_thread is None
+
+    def test_background_refresh_not_started_without_refresh_token(self, token_path):
+        self._write_creds(
+            token_path,
+            access_token="token",
+            expiry_date=(time.time() + 3600) * 1000,
+        )
+        auth = FakeAuthenticator()
+        assert auth.get_access_token() == "token"
+        assert auth._refresh_thread is None
+
+    def test_close_stops_background_refresh(self, token_path):
+        self._write_creds(
+            token_path,
+            access_token="token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() + 3600) * 1000,
+        )
+        auth = FakeAuthenticator()
+        assert auth.get_access_token() == "token"
+        refresh_thread = auth._refresh_thread
+        assert refresh_thread is not None and refresh_thread.is_alive()
+
+        auth.close()
+        assert not refresh_thread.is_alive()
+        assert auth._refresh_thread is None
+
+        # the next load of the creds starts a new refresher
+        stat = os.stat(token_path)
+        os.utime(token_path, (stat.st_atime, stat.st_mtime + 10))
+        assert auth.get_access_token() == "token"
+        assert auth._refresh_thread is not None
+        assert auth._refresh_thread is not refresh_thread
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_save_and_load_creds_roundtrip(self, token_path, use_orjson):
+        """Creds round-trip with orjson and with the stdlib json fallback."""
+        orjson_module = pytest.importorskip("orjson") if use_orjson else None
+        auth = FakeAuthenticator()
+        creds = {"access_token": "token", "expiry_date": 1730000000000}
+        with patch("litellm.llms.base_llm.oauth.authenticator.orjson", orjson_module):
+            auth._save_creds(creds)
+            loaded = auth._load_creds()
+            assert loaded == {**creds, "_expiry_seconds": 1730000000.0}
+            # the normalized expiry is not written back to the shared creds file
+            auth._save_creds(loaded)
+        assert json.loads(token_path.read_text()) == creds
+
+    def test_background_refresh_failure_is_retried_later(self, token_path):
+        """Transient refresh failures are retried with exponential backoff."""
+        self._write_creds(
+            token_path,
+            access_token="expiring-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() + 120) * 1000,
+        )
+        auth = FakeAuthenticator()
+        mock_client = MagicMock()
+        mock_client.post.side_effect = httpx.ConnectError("boom")
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ), patch(
+            "litellm.llms.base_llm.oauth.authenticator.BACKGROUND_REFRESH_RETRY_SECONDS",
+            0.1,
+        ):
+            assert auth._background_refresh() is False
+            assert auth.get_access_token() == "expiring-token"
+            # first attempt, then retries after 0.1s, 0.2s and 0.4s; the next
+            # one is 0.8s later (a fixed 0.1s delay would give ~10 attempts)
+            time.sleep(1.0)
+            assert 4 <= mock_client.post.call_count - 1 <= 5
+            assert auth._refresh_thread is not None
+
+    def test_background_refresh_survives_unexpected_errors(self, token_path):
+        """An unexpected error is retried like a transient failure."""
+        self._write_creds(
+            token_path,
+            access_token="expiring-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() + 120) * 1000,
+        )
+        auth = FakeAuthenticator()
+        mock_client = MagicMock()
+        mock_client.post.side_effect = RuntimeError("boom")
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ), patch(
+            "litellm.llms.base_llm.oauth.authenticator.BACKGROUND_REFRESH_RETRY_SECONDS",
+            0.05,
+        ):
+            assert auth.get_access_token() == "expiring-token"
+            refresh_thread = auth._refresh_thread
+            deadline = time.time() + 5
+            while mock_client.post.call_count < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            assert mock_client.post.call_count >= 2
+            assert refresh_thread.is_alive()
+            assert auth._refresh_thread is refresh_thread
+
+    def test_dead_refresher_is_replaced(self, token_path):
+        self._write_creds(
+            token_path,
+            access_token="token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() + 3600) * 1000,
+        )
+        auth = FakeAuthenticator()
+        dead_thread = threading.Thread(target=lambda: None)
+        dead_thread.start()
+        dead_thread.join()
+        auth._refresh_thread = dead_thread
+
+        assert auth.get_access_token() == "token"
+        assert auth._refresh_thread is not dead_thread
+        assert auth._refresh_thread.is_alive()
+
+    @pytest.mark.parametrize("creds_removed", [False, True])
+    def test_background_refresh_stops_on_permanent_failure(self, token_path, creds_removed):
+        """A revoked refresh token or removed creds file stops the refresher."""
+        self._write_creds(
+            token_path,
+            access_token="expiring-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() + 120) * 1000,
+        )
+        request = httpx.Request("POST", "https://example.com/token")
+        response = httpx.Response(400, request=request)
+        mock_client = MagicMock()
+        mock_client.post.side_effect = httpx.HTTPStatusError(
+            "invalid_grant", request=request, response=response
+        )
+        auth = FakeAuthenticator()
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            creds = auth._load_creds()
+            if creds_removed:
+                token_path.unlink()
+            auth._update_cache(creds, None)
+            refresh_thread = auth._refresh_thread
+            refresh_thread.join(timeout=5)
+
+        assert not refresh_thread.is_alive()
+        assert auth._refresh_thread is None
+        assert mock_client.post.call_count == (0 if creds_removed else 1)
+
+    @pytest.mark.parametrize("fsync_env, expect_fsync", [(None, False), ("1", True)])
+    def test_save_creds_fsync_is_opt_in(
+        self, token_path, monkeypatch, fsync_env, expect_fsync
+    ):
+        if fsync_env is None:
+            monkeypatch.delenv("FAKE_OAUTH_FSYNC", raising=False)
+        else:
+            monkeypatch.setenv("FAKE_OAUTH_FSYNC", fsync_env)
+        auth = FakeAuthenticator()
+
+        with patch("os.fsync") as mock_fsync:
+            auth._save_creds({"access_token": "token"})
+
+        assert mock_fsync.called is expect_fsync
+        assert json.loads(token_path.read_text()) == {"access_token": "token"}
+
+    def test_concurrent_refreshes_are_collapsed(self, token_path):
+        """Concurrent callers with an expired token trigger a single refresh."""
+        self._write_creds(
+            token_path,
+            access_token="expired-token",
+            refresh_token="refresh-token",
+            expiry_date=(time.time() - 10) * 1000,
+        )
+        auth = FakeAuthenticator()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "access_token": "fresh-token",
+            "expires_in": 3600,
+        }
+
+        def slow_post(*args, **kwargs):
+            time.sleep(0.2)
+            return mock_response
+
+        mock_client = MagicMock()
+        mock_client.post.side_effect = slow_post
+        barrier = threading.Barrier(5)
+
+        def call():
+            barrier.wait()
+            return auth.get_access_token()
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ), ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lambda _: call(), range(5)))
+
+        assert results == ["fresh-token"] * 5
+        mock_client.post.assert_called_once()
+
+    def test_stale_caller_reuses_refresh_that_already_finished(self, token_path):
+        """
+        A caller that read the creds before another refresh finished doesn't
+        refresh again with the old, already rotated refresh token.
+        """
+        self._write_creds(
+            token_path,
+            access_token="expired-token",
+            refresh_token="refresh-token-1",
+            expiry_date=(time.time() - 10) * 1000,
+        )
+        auth = FakeAuthenticator()
+        stale_creds = auth._load_creds()
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "access_token": "fresh-token",
+            "refresh_token": "refresh-token-2",
+            "expires_in": 3600,
+        }
+        mock_client = MagicMock()
+        mock_client.post.return_value = mock_response
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            assert auth.get_access_token() == "fresh-token"
+            # the stale caller only claims the refresh once the first one is done
+            assert (
+                auth._refresh_access_token_once("refresh-token-1", stale_creds)
+                == "fresh-token"
+            )
+
+        mock_client.post.assert_called_once()
+        assert json.loads(token_path.read_text())["refresh_token"] == "refresh-token-2"
+
+    def test_refresh_maps_http_status_error(self):
+        auth = FakeAuthenticator()
+        request = httpx.Request("POST", "https://example.com/token")
+        response = httpx.Response(400, request=request)
+        mock_client = MagicMock()
+        mock_client.post.side_effect = httpx.HTTPStatusError(
+            "bad request", request=request, response=response
+        )
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ), pytest.raises(FakeRefreshTokenError) as exc_info:
+            auth._refresh_access_token("refresh-token", {})
+        assert exc_info.value.status_code == 400
+
+    def test_refresh_missing_access_token_is_unauthorized(self):
+        auth = FakeAuthenticator()
+        mock_client = MagicMock()
+        mock_client.post.return_value.json.return_value = {"error": "invalid_grant"}
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ), pytest.raises(FakeRefreshTokenError) as exc_info:
+            auth._refresh_access_token("refresh-token", {})
+        assert exc_info.value.status_code == 401
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            [{"access_token": "fresh-token"}],
+            {"access_token": ["fresh-token"]},
+            {"access_token": "fresh-token", "expires_in": "soon"},
+            {"access_token": "fresh-token", "expires_in": None},
+            {"access_token": "fresh-token", "expiry_date": "tomorrow"},
+            {"access_token": "fresh-token", "expiry_date": True},
+            {"access_token": "fresh-token", "expiry_date": float("nan")},
+        ],
+    )
+    def test_refresh_malformed_response_raises_refresh_error(self, token_path, payload):
+        auth = FakeAuthenticator()
+        mock_response = MagicMock()
+        mock_response.json.return_value = payload
+        mock_client = MagicMock()
+        mock_client.post.return_value = mock_response
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ), pytest.raises(FakeRefreshTokenError) as exc_info:
+            auth._refresh_access_token("refresh-token", {})
+        assert exc_info.value.status_code == 500
+        assert not token_path.exists()
+
+    def test_refresh_accepts_numeric_string_expiry(self, token_path):
+        auth = FakeAuthenticator()
+        expiry_date = (time.time() + 3600) * 1000
+        mock_client = MagicMock()
+        mock_client.post.return_value.json.return_value = {
+            "access_token": "fresh-token",
+            "expiry_date": str(expiry_date),
+        }
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            assert auth._refresh_access_token("refresh-token", {}) == "fresh-token"
+        assert json.loads(token_path.read_text())["expiry_date"] == expiry_date
+
+    def test_save_creds_is_atomic_and_private(self, token_path):
+        auth = FakeAuthenticator()
+        auth._save_creds({"access_token": "token"})
+
+        assert json.loads(token_path.read_text()) == {"access_token": "token"}
+        assert os.listdir(token_path.parent) == [token_path.name]
+        if os.name == "posix":
+            assert os.stat(token_path).st_mode & 0o777 == 0o600
+
+    def test_cached_token_past_deadline_is_not_served(self, token_path):
+        expiry_seconds = time.time() + 3600
+        self._write_creds(
+            token_path,
+            access_token="token",
+            expiry_date=expiry_seconds * 1000,
+        )
+        auth = FakeAuthenticator()
+        assert auth.get_access_token() == "token"
+        assert auth._cached_expiry_deadline == int(expiry_seconds) - 60
+
+        auth._cached_expiry_deadline = int(time.time()) - 1
+        with patch.object(auth, "_load_creds", wraps=auth._load_creds) as mock_load:
+            assert auth.get_access_token() == "token"
+            mock_load.assert_called_once()
+
+    def test_get_shared_is_per_token_path(self, token_path, tmp_path, monkeypatch):
+        """Callers share one authenticator (and its cache) per token path."""
+        auth = FakeAuthenticator.get_shared()
+        assert FakeAuthenticator.get_shared() is auth
+
+        monkeypatch.setenv("FAKE_OAUTH_TOKEN_FILE", str(tmp_path / "other_creds.json"))
+        other = FakeAuthenticator.get_shared()
+        assert other is not auth
+        assert other.token_path == str(tmp_path / "other_creds.json")
+
+    def test_token_path_resolution(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("FAKE_OAUTH_TOKEN_FILE", raising=False)
+        monkeypatch.delenv("FAKE_OAUTH_TOKEN_DIR", raising=False)
+        assert FakeAuthenticator().token_path == FakeAuthenticator.default_token_path
+
+        monkeypatch.setenv("FAKE_OAUTH_TOKEN_FILE", "~/creds.json")
+        assert FakeAuthenticator().token_path == os.path.expanduser("~/creds.json")
+
+        monkeypatch.setenv("FAKE_OAUTH_TOKEN_DIR", str(tmp_path))
+        assert FakeAuthenticator().token_path == str(tmp_path / "oauth_creds.json")
+
+    def test_refresh_request(self, token_path):
+        auth = FakeAuthenticator()
+        mock_client = MagicMock()
+        mock_client.post.return_value.json.return_value = {"access_token": "fresh-token"}
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            auth._refresh_access_token("refresh/token+1", {})
+
+        assert mock_client.post.call_args.args == ("https://auth.example.com/token",)
+        body = parse_qs(mock_client.post.call_args.kwargs["content"])
+        assert body == {
+            "grant_type": ["refresh_token"],
+            "client_id": ["client-id"],
+            "refresh_token": ["refresh/token+1"],
+        }
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs
+
+import pytest
+
+import litellm
+from litellm.exceptions import AuthenticationError
+from litellm.llms.gemini_oauth.authenticator import (
+    DEFAULT_TOKEN_PATH,
+    GOOGLE_TOKEN_ENDPOINT,
+    OAUTH_CLIENT_ID,
+    OAUTH_CLIENT_SECRET,
+    Authenticator,
+    get_authenticator,
+)
+from litellm.llms.gemini_oauth.chat.transformation import GeminiOAuthConfig
+
+
+class TestGeminiOAuthAuthenticator:
+    @pytest.fixture
+    def token_path(self, tmp_path, monkeypatch):
+        path = tmp_path / "oauth_creds.json"
+        monkeypatch.setenv("GEMINI_OAUTH_TOKEN_FILE", str(path))
+        monkeypatch.delenv("GEMINI_OAUTH_TOKEN_DIR", raising=False)
+        return path
+
+    def test_get_authenticator_is_shared_per_token_path(
+        self, token_path, tmp_path, monkeypatch
+    ):
+        """Configs share one authenticator (and its cache) per token path."""
+        auth = get_authenticator()
+        assert get_authenticator() is auth
+        assert GeminiOAuthConfig().authenticator is auth
+
+        monkeypatch.setenv("GEMINI_OAUTH_TOKEN_FILE", str(tmp_path / "other_creds.json"))
+        other = get_authenticator()
+        assert other is not auth
+        assert other.token_path == str(tmp_path / "other_creds.json")
+
+    def test_token_path_resolution(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("GEMINI_OAUTH_TOKEN_FILE", raising=False)
+        monkeypatch.delenv("GEMINI_OAUTH_TOKEN_DIR", raising=False)
+        assert Authenticator().token_path == DEFAULT_TOKEN_PATH
+
+        monkeypatch.setenv("GEMINI_OAUTH_TOKEN_FILE", "~/creds.json")
+        assert Authenticator().token_path == os.path.expanduser("~/creds.json")
+
+        monkeypatch.setenv("GEMINI_OAUTH_TOKEN_DIR", str(tmp_path))
+        assert Authenticator().token_path == str(tmp_path / "oauth_creds.json")
+
+    def test_refresh_request_body(self, token_path):
+        auth = Authenticator()
+        mock_client = MagicMock()
+        mock_client.post.return_value.json.return_value = {"access_token": "fresh-token"}
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            auth._refresh_access_token("refresh/token+1", {})
+
+        assert mock_client.post.call_args.args == (GOOGLE_TOKEN_ENDPOINT,)
+        body = parse_qs(mock_client.post.call_args.kwargs["content"])
+        assert body == {
+            "grant_type": ["refresh_token"],
+            "client_id": [OAUTH_CLIENT_ID],
+            "client_secret": [OAUTH_CLIENT_SECRET],
+            "refresh_token": ["refresh/token+1"],
+        }
+
+    def test_malformed_refresh_response_raises_authentication_error(self, token_path):
+        token_path.write_text(
+            json.dumps(
+                {
+                    "access_token": "expired-token",
+                    "refresh_token": "refresh-token",
+                    "expiry_date": (time.time() - 10) * 1000,
+                }
+            )
+        )
+        config = GeminiOAuthConfig()
+        mock_client = MagicMock()
+        mock_client.post.return_value.json.return_value = {
+            "access_token": "fresh-token",
+            "expiry_date": "tomorrow",
+        }
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ), pytest.raises(AuthenticationError):
+            config._get_openai_compatible_provider_info(
+                "gemini-2.5-pro", None, None, "gemini_oauth"
+            )
+
+    async def test_acompletion_refreshes_token_off_the_event_loop(self, token_path):
+        token_path.write_text(
+            json.dumps(
+                {
+                    "access_token": "expired-token",
+                    "refresh_token": "refresh-token",
+                    "expiry_date": (time.time() - 10) * 1000,
+                }
+            )
+        )
+        auth = get_authenticator()
+        blocking_threads = []
+
+        def post(*args, **kwargs):
+            blocking_threads.append(threading.get_ident())
+            response = MagicMock()
+            response.json.return_value = {"access_token": "fresh-token", "expires_in": 3600}
+            return response
+
+        def load_creds(original=auth._load_creds):
+            blocking_threads.append(threading.get_ident())
+            return original()
+
+        mock_client = MagicMock()
+        mock_client.post.side_effect = post
+
+        try:
+            with patch(
+                "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+                return_value=mock_client,
+            ), patch.object(auth, "_load_creds", side_effect=load_creds):
+                response = await litellm.acompletion(
+                    model="gemini_oauth/gemini-2.5-pro",
+                    messages=[{"role": "user", "content": "hi"}],
+                    mock_response="hello",
+                )
+        finally:
+            auth.close()
+
+        assert response.choices[0].message.content == "hello"
+        mock_client.post.assert_called_once()
+        assert blocking_threads
+        assert threading.get_ident() not in blocking_threads
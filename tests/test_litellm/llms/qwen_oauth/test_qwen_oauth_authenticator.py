@@ -0,0 +1,93 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs
+
+import pytest
+
+from litellm.llms.qwen_oauth.authenticator import (
+    DEFAULT_TOKEN_PATH,
+    QWEN_OAUTH_CLIENT_ID,
+    QWEN_OAUTH_TOKEN_ENDPOINT,
+    Authenticator,
+    get_authenticator,
+)
+from litellm.llms.qwen_oauth.chat.transformation import QwenOAuthConfig
+
+
+class TestQwenOAuthAuthenticator:
+    @pytest.fixture
+    def token_path(self, tmp_path, monkeypatch):
+        path = tmp_path / "oauth_creds.json"
+        monkeypatch.setenv("QWEN_OAUTH_TOKEN_FILE", str(path))
+        monkeypatch.delenv("QWEN_OAUTH_TOKEN_DIR", raising=False)
+        return path
+
+    def _write_creds(self, path, **creds):
+        path.write_text(json.dumps(creds))
+
+    def test_get_authenticator_is_shared_per_token_path(
+        self, token_path, tmp_path, monkeypatch
+    ):
+        """Configs share one authenticator (and its cache) per token path."""
+        auth = get_authenticator()
+        assert get_authenticator() is auth
+        assert QwenOAuthConfig().authenticator is auth
+
+        monkeypatch.setenv("QWEN_OAUTH_TOKEN_FILE", str(tmp_path / "other_creds.json"))
+        other = get_authenticator()
+        assert other is not auth
+        assert other.token_path == str(tmp_path / "other_creds.json")
+
+    def test_token_path_resolution(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("QWEN_OAUTH_TOKEN_FILE", raising=False)
+        monkeypatch.delenv("QWEN_OAUTH_TOKEN_DIR", raising=False)
+        assert Authenticator().token_path == DEFAULT_TOKEN_PATH
+
+        monkeypatch.setenv("QWEN_OAUTH_TOKEN_FILE", "~/creds.json")
+        assert Authenticator().token_path == os.path.expanduser("~/creds.json")
+
+        monkeypatch.setenv("QWEN_OAUTH_TOKEN_DIR", str(tmp_path))
+        assert Authenticator().token_path == str(tmp_path / "oauth_creds.json")
+
+    def test_refresh_request_body(self, token_path):
+        auth = Authenticator()
+        mock_client = MagicMock()
+        mock_client.post.return_value.json.return_value = {"access_token": "fresh-token"}
+
+        with patch(
+            "litellm.llms.base_llm.oauth.authenticator._get_httpx_client",
+            return_value=mock_client,
+        ):
+            auth._refresh_access_token("refresh/token+1", {})
+
+        assert mock_client.post.call_args.args == (QWEN_OAUTH_TOKEN_ENDPOINT,)
+        body = parse_qs(mock_client.post.call_args.kwargs["content"])
+        assert body == {
+            "grant_type": ["refresh_token"],
+            "client_id": [QWEN_OAUTH_CLIENT_ID],
+            "refresh_token": ["refresh/token+1"],
+        }
+
+    def test_get_api_base_is_cached_until_creds_change(self, token_path):
+        self._write_creds(
+            token_path,
+            access_token="token",
+            resource_url="https://resource.example.com/v1",
+        )
+        auth = Authenticator()
+        assert auth.get_api_base() == "https://resource.example.com/v1"
+
+        with patch.object(auth, "_load_creds") as mock_load:
+            assert auth.get_api_base() == "https://resource.example.com/v1"
+            assert auth.get_access_token() == "token"
+            mock_load.assert_not_called()
+
+        self._write_creds(token_path, access_token="token")
+        stat = os.stat(token_path)
+        os.utime(token_path, (stat.st_atime, stat.st_mtime + 10))
+        assert auth.get_api_base() == auth.api_base
+
+    def test_get_api_base_without_creds_uses_default(self, token_path):
+        auth = Authenticator()
+        assert auth.get_api_base() == auth.api_base